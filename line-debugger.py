@@ -1,7 +1,14 @@
 import re
-import json
-from typing import List, Dict, Optional
+import sys
+import functools
+import itertools
+import orjson
+import ijson
+import asyncio
+from concurrent.futures import ThreadPoolExecutor
+from typing import Iterable, List, Dict, Optional
 from azure.storage.blob import BlobServiceClient
+from azure.storage.blob.aio import BlobServiceClient as AioBlobServiceClient
 import os
 import dotenv
 
@@ -25,126 +32,148 @@ class StructureDetector:
     """
     Detects structure in legal documents with STRICT validation.
     """
-    
-    # Chapter/Part/Division patterns
-    CHAPTER = re.compile(
-        r'Chapter\s+([IVXLC\d]+[A-Z]?)[\s.:—–-]+([A-Z][^\n]{10,150})',
-        re.IGNORECASE
-    )
-    PART = re.compile(
-        r'Part\s+([IVXLC\d]+[A-Z]?)[\s.:—–-]+([A-Z][^\n]{10,150})',
-        re.IGNORECASE
-    )
-    DIVISION = re.compile(
-        r'Division\s+(\d+[A-Z]?)[\s.:—–-]+([A-Z][^\n]{10,150})',
-        re.IGNORECASE
-    )
-    
-    # STRICT SECTION PATTERNS by document type
-    
-    # Constitution style: "7.  The Senate."
-    # - Number + period
-    # - Two spaces (sometimes one)
-    # - Title (capitalized)
-    # - Ends with period
-    SECTION_CONSTITUTION = re.compile(
-        r'^(\d+[A-Z]?)\.\s{1,3}([A-Z][A-Za-z\s]{3,80})\.$',
-        re.MULTILINE
-    )
-    
-    # Criminal Code style: "354 Kidnapping" or "354A Kidnapping for ransom"
-    # - Number (with optional letter)
-    # - Single space
-    # - Title (NO period at end, appears mid-flow)
-    # - Must be followed by actual content (not a page number)
-    SECTION_CODE = re.compile(
-        r'^(\d+[A-Z]?)\s+([A-Z][a-z]{3,}(?:\s+[a-z]+){0,10})(?=\s+[A-Z(]|\s*$)',
-        re.MULTILINE
+
+    # All structural patterns fused into one alternation so each line takes
+    # a single regex pass instead of up to five. Branches:
+    # - chapter/part/division: inline headings, keyword case-insensitive
+    # - sec_const: Constitution style "7.  The Senate." (number + period,
+    #   1-3 spaces, capitalized title, trailing period)
+    # - sec_code: Criminal Code style "354 Kidnapping" (number, single
+    #   space, lowercase-continued title, no trailing period)
+    # - subsection: "(1) ", "(a) "
+    # Whitespace inside every branch is [^\S\n] / space-tab only: the same
+    # alternation is re-run with re.MULTILINE over newline-joined pages
+    # (_PAGE_DETECT), and a plain \s would let a heading match swallow the
+    # following line
+    DETECT = re.compile(
+        r'(?P<chapter>(?i:Chapter)[^\S\n]+(?P<ch_num>[IVXLC\d]+[A-Z]?)[ \t.:—–-]+(?P<ch_title>[A-Z][^\n]{10,150}))'
+        r'|(?P<part>(?i:Part)[^\S\n]+(?P<pt_num>[IVXLC\d]+[A-Z]?)[ \t.:—–-]+(?P<pt_title>[A-Z][^\n]{10,150}))'
+        r'|(?P<division>(?i:Division)[^\S\n]+(?P<dv_num>\d+[A-Z]?)[ \t.:—–-]+(?P<dv_title>[A-Z][^\n]{10,150}))'
+        r'|(?P<sec_const>^(?P<sc_num>\d+[A-Z]?)\.[^\S\n]{1,3}(?P<sc_title>[A-Z][A-Za-z \t]{3,80})\.$)'
+        r'|(?P<sec_code>^(?P<cd_num>\d+[A-Z]?)[^\S\n]+(?P<cd_title>[A-Z][a-z]{3,}+(?:[^\S\n]+[a-z]+){0,10}+)(?=[^\S\n]+[A-Z(]|[^\S\n]*$))'
+        r'|(?P<subsection>^[^\S\n]*\((?P<sub_num>[0-9]+|[a-z]+)\)(?=\s))'
     )
-    
-    SUBSECTION = re.compile(r'^\s*\(([0-9]+|[a-z]+)\)\s+', re.MULTILINE)
 
     @classmethod
     def detect(cls, text: str, doc_type: str = "auto"):
         """
-        Detect structure type with document-specific patterns.
-        
+        Detect structure type with a single fused pattern scan.
+
         doc_type: "constitution", "code", or "auto"
         """
-        text = text.strip()
+        kind, number, title = _detect_cached(text.strip())
+        if number is None:
+            return kind, None
+        if title is None:
+            return kind, {"number": number}
+        return kind, {"number": number, "title": title}
+
+    @classmethod
+    def _classify(cls, text: str):
+        """Uncached classification. Returns a (kind, number, title) tuple
+        so results are hashable and shareable across cache hits."""
         if not text or len(text) < 5:
-            return "text", None
+            return "text", None, None
+
+        # Cheap first-character gate: every structural form starts with a
+        # digit, '(' or the C/P/D of its keyword, so most body lines skip
+        # the alternation entirely
+        first = text[0]
+        if first != '(' and not first.isdigit() and first not in 'CcPpDd':
+            return "text", None, None
+
+        m = cls.DETECT.search(text)
+        if not m:
+            return "text", None, None
 
         # Structural elements (same for all doc types)
-        if m := cls.CHAPTER.search(text):
-            title = m.group(2).strip().rstrip('.')
+        if m.group("chapter"):
+            title = m.group("ch_title").strip().rstrip('.')
             if len(title) > 10:
-                return "chapter", {
-                    "number": m.group(1).strip(),
-                    "title": title
-                }
+                return "chapter", m.group("ch_num").strip(), title
+            return "text", None, None
 
-        if m := cls.PART.search(text):
-            title = m.group(2).strip().rstrip('.')
+        if m.group("part"):
+            title = m.group("pt_title").strip().rstrip('.')
             if len(title) > 10:
-                return "part", {
-                    "number": m.group(1).strip(),
-                    "title": title
-                }
+                return "part", m.group("pt_num").strip(), title
+            return "text", None, None
 
-        if m := cls.DIVISION.search(text):
-            title = m.group(2).strip().rstrip('.')
+        if m.group("division"):
+            title = m.group("dv_title").strip().rstrip('.')
             if len(title) > 10:
-                return "division", {
-                    "number": m.group(1).strip(),
-                    "title": title
-                }
+                return "division", m.group("dv_num").strip(), title
+            return "text", None, None
+
+        # Section detection - Constitution pattern is the stricter one
+        if m.group("sec_const"):
+            # Intern the number: it reappears in chunk_id, metadata and
+            # progression checks, so one shared string beats N copies
+            return "section", sys.intern(m.group("sc_num")), m.group("sc_title").strip()
+
+        if m.group("sec_code"):
+            number = m.group("cd_num")
+            title = m.group("cd_title").strip()
 
-        # Section detection - try both patterns
-        section_match = None
-        
-        # Try Constitution pattern first (more strict)
-        if m := cls.SECTION_CONSTITUTION.match(text):
-            section_match = (m.group(1), m.group(2).strip())
-        # Try Code pattern if Constitution didn't match
-        elif m := cls.SECTION_CODE.match(text):
-            number = m.group(1)
-            title = m.group(2).strip()
-            
-            # Additional validation for Code pattern
-            # Reject if title is a common false positive
-            reject_words = ['Page', 'January', 'February', 'March', 'April', 'May', 
-                           'June', 'July', 'August', 'September', 'October', 
-                           'November', 'December', 'Compilation', 'Contents', 
-                           'Registered', 'Volume', 'Schedule', 'Includes']
-            
             # Check if first word is a reject word OR if title is too short
             first_word = title.split()[0] if title.split() else ""
-            
-            if first_word not in reject_words and len(title) >= 8:
+
+            if first_word not in _REJECT_WORDS and len(title) >= 8:
                 # Check section number is reasonable
                 try:
-                    num_val = int(re.sub(r'[A-Z]', '', number))
+                    num_val = int(number.translate(_STRIP_UPPER))
                     if 1 <= num_val <= 10000:
                         # Final check: title should have at least 2 words or be a compound word
                         word_count = len(title.split())
                         if word_count >= 2 or len(title) >= 12:
-                            section_match = (number, title)
+                            return "section", sys.intern(number), title
                 except ValueError:
                     pass
-        
-        if section_match:
-            return "section", {
-                "number": section_match[0],
-                "title": section_match[1]
-            }
+            return "text", None, None
+
+        if m.group("subsection"):
+            return "subsection", m.group("sub_num"), None
+
+        return "text", None, None
+
+
+# Legal text repeats lines (running headers, TOC echoes, amendment
+# boilerplate), so classification results are memoized. Tuples keep the
+# cached values immutable; the dicts handed to callers are rebuilt per
+# call in detect() so mutation can't poison the cache.
+@functools.lru_cache(maxsize=16384)
+def _detect_cached(text):
+    return StructureDetector._classify(text)
 
-        if cls.SUBSECTION.match(text):
-            m = re.match(r'^\s*\(([0-9]+|[a-z]+)\)', text)
-            if m:
-                return "subsection", {"number": m.group(1)}
 
-        return "text", None
+# Common false-positive first words for the Code section pattern, built
+# once as a frozenset so each membership test is a single hash probe
+_REJECT_WORDS = frozenset({
+    'Page', 'January', 'February', 'March', 'April', 'May',
+    'June', 'July', 'August', 'September', 'October',
+    'November', 'December', 'Compilation', 'Contents',
+    'Registered', 'Volume', 'Schedule', 'Includes',
+})
+
+# Hot-loop helper patterns, compiled once at module scope
+# Front-matter probe: Constitution and Code section shapes fused into one
+# alternation so each early page takes a single scan
+_FM_PROBE = re.compile(
+    r'(?:^\d+\.\s{1,3}[A-Z][a-z]+)|(?:^\d+[A-Z]?\s+[A-Z][a-z]+\s+[A-Z(])',
+    re.MULTILINE,
+)
+_SENT_SPLIT = re.compile(r'(?<=[.?!])\s+(?=[A-Z0-9(])')
+# Sentence spans ending at '. ' - used to slice long lines in one pass
+_LONG_SENT = re.compile(r'[^.]+\.\s+')
+
+# Translate table that deletes A-Z: a single C pass over a <=5 char section
+# number, instead of spinning up the regex engine for it
+_STRIP_UPPER = str.maketrans('', '', 'ABCDEFGHIJKLMNOPQRSTUVWXYZ')
+
+# The fused detector alternation recompiled for whole-page tokenization:
+# one MULTILINE finditer pass yields every structural candidate on a page,
+# so the detector only runs on candidates instead of on every line
+_PAGE_DETECT = re.compile(StructureDetector.DETECT.pattern, re.MULTILINE)
 
 
 # -------------------------
@@ -154,8 +183,13 @@ class LegalChunker:
     def __init__(self, doc_type: str = "auto"):
         self.detector = StructureDetector()
         self.doc_type = doc_type
+        # Breadcrumb fragments, formatted when the context changes so
+        # _create_chunk only joins cached strings
+        self._chapter_crumb = None
+        self._part_crumb = None
+        self._division_crumb = None
 
-    def chunk(self, parsed_doc: dict) -> List[Dict]:
+    def chunk(self, pages: Iterable[Dict]) -> List[Dict]:
         chunks = []
 
         current_chapter = None
@@ -167,108 +201,114 @@ class LegalChunker:
         prev_section_num = None
         section_count = 0
 
-        for page in parsed_doc["pages"]:
-            page_num = page["page_number"]
-            
-            # Skip obvious front matter (adjust based on your docs)
-            if page_num <= 3:
-                # Quick check: does this page have section-like content?
-                test_text = page["text"][:500]
-                if not re.search(r'^\d+\.\s{1,3}[A-Z][a-z]+', test_text, re.MULTILINE):
-                    if not re.search(r'^\d+[A-Z]?\s+[A-Z][a-z]+\s+[A-Z(]', test_text, re.MULTILINE):
-                        continue
-            
-            lines = self._split_text(page["text"])
+        # Bound-method localization: the reducer loop calls these once or
+        # more per event, and a local name skips the attribute lookup
+        buffer_append = buffer.append
+        chunks_append = chunks.append
 
-            for line in lines:
-                kind, meta = self.detector.detect(line, self.doc_type)
+        for kind, meta, page_num, line in self._events(pages):
+            match kind:
+                case "text":
+                    # Body text (between-candidate spans, rejected
+                    # candidates, subsection markers)
+                    if current_section:
+                        buffer_append(line)
 
-                if kind == "chapter":
+                case "section":
+                    # Validation: reasonable section progression
+                    try:
+                        current_num = int(meta['number'].translate(_STRIP_UPPER))
+
+                        # Skip if suspicious
+                        if prev_section_num:
+                            # Don't go backwards (unless resetting at new chapter)
+                            if current_num < prev_section_num and (current_num > 10):
+                                continue
+                            # Don't jump more than 200 sections
+                            if current_num > prev_section_num + 200:
+                                continue
+
+                        prev_section_num = current_num
+                    except ValueError:
+                        pass
+
+                    # Flush previous section
                     if current_section and buffer:
-                        chunks.append(
+                        chunks_append(
                             self._create_chunk(
                                 current_section, buffer,
                                 current_chapter, current_part, current_division
                             )
                         )
-                        buffer = []
-                        current_section = None
-                    
-                    current_chapter = meta
-                    current_part = None
-                    current_division = None
+                        buffer.clear()
+
+                    # Start new section - the header line lives in the
+                    # section metadata, not the body buffer, so chunks no
+                    # longer need the header stripped back out of the text
+                    current_section = {
+                        **meta,
+                        "page_start": page_num
+                    }
+                    section_count += 1
 
-                elif kind == "part":
+                case "chapter":
                     if current_section and buffer:
-                        chunks.append(
+                        chunks_append(
                             self._create_chunk(
                                 current_section, buffer,
                                 current_chapter, current_part, current_division
                             )
                         )
-                        buffer = []
+                        buffer.clear()
                         current_section = None
-                    
-                    current_part = meta
-                    current_division = None
 
-                elif kind == "division":
+                    current_chapter = meta
+                    current_part = None
+                    current_division = None
+                    # Format the crumb once per context change, not per chunk
+                    self._chapter_crumb = "Chapter " + meta['number'] + (
+                        ": " + meta['title'] if meta['title'] else ""
+                    )
+                    self._part_crumb = None
+                    self._division_crumb = None
+
+                case "part":
                     if current_section and buffer:
-                        chunks.append(
+                        chunks_append(
                             self._create_chunk(
                                 current_section, buffer,
                                 current_chapter, current_part, current_division
                             )
                         )
-                        buffer = []
+                        buffer.clear()
                         current_section = None
-                    
-                    current_division = meta
 
-                elif kind == "section":
-                    # Validation: reasonable section progression
-                    try:
-                        current_num = int(re.sub(r'[A-Z]', '', meta['number']))
-                        
-                        # Skip if suspicious
-                        if prev_section_num:
-                            # Don't go backwards (unless resetting at new chapter)
-                            if current_num < prev_section_num and (current_num > 10):
-                                continue
-                            # Don't jump more than 200 sections
-                            if current_num > prev_section_num + 200:
-                                continue
-                        
-                        prev_section_num = current_num
-                    except ValueError:
-                        pass
-                    
-                    # Flush previous section
+                    current_part = meta
+                    current_division = None
+                    self._part_crumb = "Part " + meta['number'] + (
+                        ": " + meta['title'] if meta['title'] else ""
+                    )
+                    self._division_crumb = None
+
+                case "division":
                     if current_section and buffer:
-                        chunks.append(
+                        chunks_append(
                             self._create_chunk(
                                 current_section, buffer,
                                 current_chapter, current_part, current_division
                             )
                         )
-                        buffer = []
-
-                    # Start new section
-                    current_section = {
-                        **meta,
-                        "page_start": page_num
-                    }
-                    buffer.append(line)
-                    section_count += 1
+                        buffer.clear()
+                        current_section = None
 
-                else:
-                    # Regular text or subsection
-                    if current_section:
-                        buffer.append(line)
+                    current_division = meta
+                    self._division_crumb = "Division " + meta['number'] + (
+                        ": " + meta['title'] if meta['title'] else ""
+                    )
 
         # Flush final section
         if current_section and buffer:
-            chunks.append(
+            chunks_append(
                 self._create_chunk(
                     current_section, buffer,
                     current_chapter, current_part, current_division
@@ -277,6 +317,54 @@ class LegalChunker:
 
         return chunks
 
+    def _events(self, pages: Iterable[Dict]):
+        """
+        Tokenize pages into (kind, meta, page_num, line) events.
+
+        Candidate matches go through the (cached) detector; spans between
+        candidates, rejected candidates and subsection markers are all
+        folded into "text" events so the reducer in chunk() stays a flat
+        match statement.
+        """
+        detect = self.detector.detect
+        doc_type = self.doc_type
+
+        for page in pages:
+            page_num = page["page_number"]
+
+            # Skip obvious front matter (adjust based on your docs)
+            if page_num <= 3:
+                # Quick check: does this page have section-like content?
+                if not _FM_PROBE.search(page["text"][:500]):
+                    continue
+
+            # Normalize to newline-separated lines, then tokenize the whole
+            # page with one multiline scan. Spans between candidate matches
+            # are body text and never touch the detector.
+            page_lines = "\n".join(self._split_text(page["text"]))
+
+            pos = 0
+            for m in _PAGE_DETECT.finditer(page_lines):
+                if pos < m.start():
+                    body = page_lines[pos:m.start()].strip()
+                    if body:
+                        yield "text", None, page_num, body.replace('\n', ' ')
+                pos = m.end()
+
+                line = m.group(0)
+                kind, meta = detect(line, doc_type)
+                if kind == "text" or kind == "subsection":
+                    # Rejected candidate or subsection marker - body text
+                    yield "text", None, page_num, line.strip()
+                else:
+                    yield kind, meta, page_num, line
+
+            # Trailing body text after the last candidate on the page
+            if pos < len(page_lines):
+                tail = page_lines[pos:].strip()
+                if tail:
+                    yield "text", None, page_num, tail.replace('\n', ' ')
+
     def _split_text(self, text: str) -> List[str]:
         """
         Split text into lines/sentences.
@@ -293,24 +381,24 @@ class LegalChunker:
                 if not line:
                     continue
                 
-                # If line is very long and has sentences, split it
+                # If line is very long and has sentences, split it with one
+                # finditer pass - slices only, no current += part stitching
                 if len(line) > 300 and '. ' in line:
-                    # Split on '. ' but keep the period
-                    parts = re.split(r'(\.\s+)', line)
-                    current = ""
-                    for i, part in enumerate(parts):
-                        current += part
-                        # When we hit a split point (odd indices), save and reset
-                        if i % 2 == 1 and len(current.strip()) > 50:
-                            lines.append(current.strip())
-                            current = ""
-                    if current.strip():
-                        lines.append(current.strip())
+                    pos = 0
+                    for m in _LONG_SENT.finditer(line):
+                        piece = line[pos:m.end()].strip()
+                        if len(piece) > 50:
+                            lines.append(piece)
+                            pos = m.end()
+                    if pos < len(line):
+                        piece = line[pos:].strip()
+                        if piece:
+                            lines.append(piece)
                 else:
                     lines.append(line)
         else:
             # No newlines - split on sentence boundaries
-            parts = re.split(r'(?<=[.?!])\s+(?=[A-Z0-9(])', text)
+            parts = _SENT_SPLIT.split(text)
             lines = [p.strip() for p in parts if p.strip()]
         
         return lines
@@ -325,53 +413,30 @@ class LegalChunker:
     ) -> dict:
         """Create chunk with metadata."""
         
-        breadcrumb = []
-        if chapter and chapter.get('number'):
-            title = f"Chapter {chapter['number']}"
-            if chapter.get('title'):
-                title += f": {chapter['title']}"
-            breadcrumb.append(title)
-            
-        if part and part.get('number'):
-            title = f"Part {part['number']}"
-            if part.get('title'):
-                title += f": {part['title']}"
-            breadcrumb.append(title)
-            
-        if division and division.get('number'):
-            title = f"Division {division['number']}"
-            if division.get('title'):
-                title += f": {division['title']}"
-            breadcrumb.append(title)
+        # Crumb strings are pre-formatted at context-change time in chunk()
+        breadcrumb = " > ".join(
+            c for c in (self._chapter_crumb, self._part_crumb, self._division_crumb) if c
+        )
 
-        # Build full text
+        # Build full text - header line is kept out of the buffer at
+        # detection time, so no startswith/slicing cleanup pass is needed
         text = " ".join(buffer)
-        
-        # Remove duplicate section header from start if present
-        section_header_variants = [
-            f"{section['number']}.  {section['title']}.",  # Constitution style
-            f"{section['number']}. {section['title']}.",
-            f"{section['number']} {section['title']}",      # Code style
-        ]
-        
-        for variant in section_header_variants:
-            if text.startswith(variant):
-                text = text[len(variant):].strip()
-                break
 
         return {
             "chunk_id": f"section_{section['number']}",
             "section_number": section["number"],
             "section_title": section["title"],
-            "breadcrumb": " > ".join(breadcrumb) if breadcrumb else "",
+            "breadcrumb": breadcrumb,
             "text": text,
             "metadata": {
                 "page_start": section.get("page_start"),
                 "chapter": chapter.get("number") if chapter else None,
                 "part": part.get("number") if part else None,
                 "division": division.get("number") if division else None,
-                "jurisdiction": "Queensland",
-                "document_type": "legislation"
+                # Interned constants: every chunk shares the same two
+                # string objects instead of carrying its own copies
+                "jurisdiction": sys.intern("Queensland"),
+                "document_type": sys.intern("legislation")
             }
         }
 
@@ -379,67 +444,132 @@ class LegalChunker:
 # -------------------------
 # PIPELINE
 # -------------------------
+class _BlobStream:
+    """Minimal file-like reader over StorageStreamDownloader.chunks()."""
+
+    def __init__(self, chunks):
+        self._chunks = chunks
+        self._buf = b""
+
+    def read(self, size=-1):
+        while size < 0 or len(self._buf) < size:
+            piece = next(self._chunks, None)
+            if piece is None:
+                break
+            self._buf += piece
+        if size < 0:
+            data, self._buf = self._buf, b""
+        else:
+            data, self._buf = self._buf[:size], self._buf[size:]
+        return data
+
+
+def _iter_pages(stream, doc_meta: dict):
+    """Yield page dicts one at a time, capturing top-level fields as seen."""
+    page_number = None
+    for prefix, event, value in ijson.parse(stream):
+        if prefix == "pages.item.page_number":
+            page_number = value
+        elif prefix == "pages.item.text":
+            yield {"page_number": page_number, "text": value}
+        elif prefix == "source_document":
+            doc_meta["source_document"] = value
+
+
+def _process_blob(blob_name, test_mode=False, limit_pages=None):
+    """Download, chunk and (optionally) upload one parsed document."""
+    print(f"\n📄 Processing: {blob_name}")
+
+    # Stream the parsed JSON page by page instead of materializing the
+    # whole document (module client is thread-safe)
+    parsed_blob = parsed_container.get_blob_client(blob_name)
+    doc_meta = {}
+    pages = _iter_pages(_BlobStream(parsed_blob.download_blob().chunks()), doc_meta)
+
+    # Detect document type from filename
+    doc_type = "auto"
+    if "constitution" in blob_name.lower():
+        doc_type = "constitution"
+        print(f"   📜 Detected: Constitution document")
+    elif "code" in blob_name.lower() or "act" in blob_name.lower():
+        doc_type = "code"
+        print(f"   ⚖️  Detected: Code/Act document")
+
+    # Limit pages for testing
+    if limit_pages:
+        pages = itertools.islice(pages, limit_pages)
+
+    # Create chunks (one chunker per task - it carries per-document state)
+    chunker = LegalChunker(doc_type=doc_type)
+    chunks = chunker.chunk(pages)
+
+    print(f"   ✅ Created {len(chunks)} chunks")
+
+    if test_mode and chunks:
+        print("\n   First 5 chunks:")
+        for i, chunk in enumerate(chunks[:5], 1):
+            print(f"\n   [{i}] Section {chunk['section_number']}: {chunk['section_title']}")
+            if chunk['breadcrumb']:
+                print(f"       📍 {chunk['breadcrumb']}")
+            print(f"       📝 {chunk['text'][:120]}...")
+
+    if not test_mode:
+        # Serialize here, upload later: the saves for all documents are
+        # batched through one async client in run_chunking
+        chunks_doc = {
+            "source_document": doc_meta.get("source_document"),
+            "total_chunks": len(chunks),
+            "chunks": chunks
+        }
+        return blob_name, orjson.dumps(chunks_doc)
+
+    return None
+
+
+async def _upload_all(pending):
+    """Fire all chunk uploads over one async client, 16 in flight."""
+    async with AioBlobServiceClient.from_connection_string(STORAGE_CONN_STRING) as service:
+        container = service.get_container_client(CHUNKS_CONTAINER)
+        sem = asyncio.Semaphore(16)
+
+        async def _put(name, data):
+            async with sem:
+                await container.upload_blob(
+                    name=name,
+                    data=data,
+                    length=len(data),
+                    overwrite=True,
+                    content_type="application/json"
+                )
+                print(f"   💾 Saved to {CHUNKS_CONTAINER}/{name}")
+
+        await asyncio.gather(*(_put(n, d) for n, d in pending))
+
+
 def run_chunking(test_mode=False, limit_pages=None):
     """Process parsed documents and create chunks."""
-    
-    for blob in parsed_container.list_blobs():
-        if not blob.name.endswith(".json"):
-            continue
-        
-        print(f"\n📄 Processing: {blob.name}")
-        
-        # Download parsed JSON
-        parsed_blob = parsed_container.get_blob_client(blob.name)
-        parsed_data = json.loads(parsed_blob.download_blob().readall())
-        
-        # Detect document type from filename
-        doc_type = "auto"
-        if "constitution" in blob.name.lower():
-            doc_type = "constitution"
-            print(f"   📜 Detected: Constitution document")
-        elif "code" in blob.name.lower() or "act" in blob.name.lower():
-            doc_type = "code"
-            print(f"   ⚖️  Detected: Code/Act document")
-        
-        # Limit pages for testing
-        if limit_pages:
-            parsed_data["pages"] = parsed_data["pages"][:limit_pages]
-        
-        # Create chunks
-        chunker = LegalChunker(doc_type=doc_type)
-        chunks = chunker.chunk(parsed_data)
-        
-        print(f"   ✅ Created {len(chunks)} chunks")
-        
-        if test_mode and chunks:
-            print("\n   First 5 chunks:")
-            for i, chunk in enumerate(chunks[:5], 1):
-                print(f"\n   [{i}] Section {chunk['section_number']}: {chunk['section_title']}")
-                if chunk['breadcrumb']:
-                    print(f"       📍 {chunk['breadcrumb']}")
-                print(f"       📝 {chunk['text'][:120]}...")
-        
-        if not test_mode:
-            # Save to chunks container
-            chunk_name = blob.name
-            chunks_doc = {
-                "source_document": parsed_data.get("source_document"),
-                "total_chunks": len(chunks),
-                "chunks": chunks
-            }
-            
-            chunks_container.upload_blob(
-                name=chunk_name,
-                data=json.dumps(chunks_doc, ensure_ascii=False, indent=2),
-                overwrite=True,
-                content_type="application/json"
-            )
-            print(f"   💾 Saved to {CHUNKS_CONTAINER}/{chunk_name}")
+
+    # Filter server-side: everything the parser writes sits under pdf/ and
+    # is JSON, so the client-side extension check is redundant
+    names = [
+        b.name
+        for b in parsed_container.list_blobs(name_starts_with="pdf/", results_per_page=5000)
+    ]
+
+    # Phase 1: download + chunk across a thread pool (I/O bound)
+    with ThreadPoolExecutor(max_workers=16) as executor:
+        pending = [
+            p for p in executor.map(lambda n: _process_blob(n, test_mode, limit_pages), names)
+            if p is not None
+        ]
+
+    # Phase 2: batch every save into one event loop so the PUTs share
+    # connections instead of paying a handshake per document
+    if pending:
+        asyncio.run(_upload_all(pending))
 
 
 if __name__ == "__main__":
-    import sys
-    
     test_mode = "--test" in sys.argv
     limit_pages = None
     
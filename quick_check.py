@@ -1,5 +1,6 @@
+import io
 import re
-import json
+import ijson
 from azure.storage.blob import BlobServiceClient
 import os
 import dotenv
@@ -10,14 +11,31 @@ STORAGE_CONN_STRING = os.getenv("STORAGE_CONN_STRING")
 blob_service = BlobServiceClient.from_connection_string(STORAGE_CONN_STRING)
 parsed_container = blob_service.get_container_client("parsed")
 
-# Test patterns on actual data
+# Test patterns on actual data. Page 10 sits near the front of the
+# document, so a ranged download of the first 512KB is enough - no need
+# to pull the whole multi-MB blob just to preview one page.
 blob = parsed_container.get_blob_client("pdf/Constitution.json")
-doc = json.loads(blob.download_blob().readall())
+head = blob.download_blob(offset=0, length=512 * 1024).readall()
+
+page_text = None
+# ijson streams the truncated head without materializing the full
+# object graph, and stops as soon as the target page appears. The head
+# is cut mid-document, so ijson raises IncompleteJSONError if it runs
+# off the end before finding the page - that just means "not in range"
+try:
+    for page in ijson.items(io.BytesIO(head), "pages.item"):
+        if page["page_number"] == 10:
+            page_text = page["text"]
+            break
+except ijson.IncompleteJSONError:
+    pass
+
+if page_text is None:
+    raise SystemExit("Page 10 not in the first 512KB - bump the range")
 
 print("Testing Constitution pattern on page 10:")
 print("=" * 80)
 
-page_text = doc["pages"][9]["text"]  # Page 10
 print(page_text[:500])
 print("\n" + "=" * 80)
 
@@ -27,4 +45,4 @@ matches = pattern.findall(page_text)
 
 print(f"\nMatches found: {len(matches)}")
 for num, title in matches[:5]:
-    print(f"  {num}. {title}")
\ No newline at end of file
+    print(f"  {num}. {title}")
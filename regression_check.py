@@ -0,0 +1,68 @@
+import functools
+import itertools
+import re
+import sys
+from typing import Iterable, List, Dict, Optional
+
+# Offline regression checks for the fused detector in line-debugger.py.
+# The script can't be imported (hyphenated name, builds Azure clients at
+# module scope), so the detector/chunker classes are sliced out of the
+# source and exec'd here - no storage account needed.
+_src = open("line-debugger.py").read()
+_body = _src[_src.index("class StructureDetector"):_src.index("# -------------------------\n# PIPELINE")]
+_ns = {
+    "re": re, "sys": sys, "functools": functools, "itertools": itertools,
+    "Iterable": Iterable, "List": List, "Dict": Dict, "Optional": Optional,
+}
+exec(_body, _ns)
+
+StructureDetector = _ns["StructureDetector"]
+LegalChunker = _ns["LegalChunker"]
+_PAGE_DETECT = _ns["_PAGE_DETECT"]
+
+# ----------------------------------------------------------------
+# Header followed by a lowercase continuation line. The multiline page
+# scan must stop the title at the line break - with plain \s in the
+# pattern the title absorbed the next line, and the possessive
+# quantifiers then dropped the section outright.
+# ----------------------------------------------------------------
+pages = [{
+    "page_number": 4,
+    "text": "354 Kidnapping another person\nwhoever does this commits a crime.\nMore body text here.",
+}]
+chunks = LegalChunker(doc_type="code").chunk(pages)
+assert len(chunks) == 1, f"expected 1 chunk, got {len(chunks)}"
+assert chunks[0]["section_title"] == "Kidnapping another person", chunks[0]["section_title"]
+assert "whoever does this commits a crime." in chunks[0]["text"], chunks[0]["text"]
+
+# ----------------------------------------------------------------
+# A lone "Chapter NN" line must not take the following line as its title
+# ----------------------------------------------------------------
+pages = [{
+    "page_number": 4,
+    "text": "354 Kidnapping another person\nChapter 33\nnot a heading, just body text.",
+}]
+chunks = LegalChunker(doc_type="code").chunk(pages)
+assert len(chunks) == 1, f"expected 1 chunk, got {len(chunks)}"
+assert "not a heading, just body text." in chunks[0]["text"], chunks[0]["text"]
+
+# Same-line headings still detect normally
+kind, meta = StructureDetector.detect("Chapter 33 Offences against liberty")
+assert kind == "chapter" and meta["number"] == "33", (kind, meta)
+
+# ----------------------------------------------------------------
+# No branch of the page-scan pattern may span two joined lines
+# ----------------------------------------------------------------
+sample = "\n".join([
+    "Chapter 33 Offences against liberty",
+    "354 Kidnapping another person",
+    "(1) A person commits a crime.",
+    "7.  The Senate",
+    "shall be composed of senators.",
+    "Division 2",
+    "continuation text in lowercase",
+])
+for m in _PAGE_DETECT.finditer(sample):
+    assert "\n" not in m.group(0), f"match spans lines: {m.group(0)!r}"
+
+print("✅ Detector regression checks passed")
@@ -1,5 +1,11 @@
+import array
+import bisect
+import functools
+import io
 import re
-import json
+import orjson
+from dataclasses import dataclass
+from azure.identity import DefaultAzureCredential
 from azure.storage.blob import BlobServiceClient
 import os
 import dotenv  
@@ -9,6 +15,7 @@ dotenv.load_dotenv()
 # CONFIG
 # -------------------------
 STORAGE_CONN_STRING = os.getenv("STORAGE_CONN_STRING")
+STORAGE_ACCOUNT_URL = os.getenv("STORAGE_ACCOUNT_URL")
 PARSED_CONTAINER = "parsed"
 BLOB_NAME = "pdf/Criminal Code Act 1899.json"
 
@@ -16,122 +23,164 @@ BLOB_NAME = "pdf/Criminal Code Act 1899.json"
 # STRICT SECTION HEADER REGEX
 # Matches:
 #   "1 Short title"
-#   "2 Establishment of Code—schedule 1"
 # Does NOT match:
-#   "1 January 2026"
+#   "1 January 2026"          (month lookahead)
 #   "2026 Act No. 5"
+#   "2 Establishment—sch 1"   (TOC row, trailing-digit lookbehinds)
 # -------------------------
+# The month lookahead and the trailing-digit lookbehind chain fold the
+# old per-line filters into the automaton itself - no title.split() or
+# second regex per candidate
 SECTION_HEADER = re.compile(
-    r'^\s*(\d+[A-Z]?)\s+([A-Z][A-Za-z0-9 ,—\-()]{3,120})\s*$'
+    r'^\s*(\d+[A-Z]?)\s+'
+    r'(?!(?:January|February|March|April|May|June|July|August'
+    r'|September|October|November|December)\b)'
+    r'([A-Z][A-Za-z0-9 ,—\-()]{3,120}?)'
+    r'(?<!\s\d)(?<!\s\d\d)(?<!\s\d\d\d)(?<!\s\d\d\d\d)\s*$'
 )
 
-SUBSECTION = re.compile(r'^\(\d+\)|^\([a-z]\)')
+# Subsection markers counted in one anchored scan: at a line start, or -
+# because the parser space-joins lines - right after a sentence boundary
+_SUB_COUNT = re.compile(r'(?m)(?:^|(?<=[.!?])\s)\((?:\d+|[a-z])\)')
 
-MONTHS = {
-    "January","February","March","April","May","June",
-    "July","August","September","October","November","December"
-}
+# Slot-based record instead of a dict per section: attribute reads are
+# fixed descriptor lookups and the per-entry memory drops severalfold
+@dataclass(slots=True)
+class Section:
+    number: str
+    title: str
+    start_offset: int
+    start_page: int
+    end_offset: int = 0
+    end_page: int = 0
+    text: str = ''
+    subsections: int = 0
 
 # -------------------------
 # HELPERS
 # -------------------------
+_SENT_SPLIT = re.compile(r'(?<=[.!?])\s+(?=[A-Z(])')
+
 def split_lines(text: str):
-    if "\n" in text:
-        return [l.strip() for l in text.splitlines() if l.strip()]
-    # fallback
-    return re.split(r'(?<=[.!?])\s+(?=[A-Z(])', text)
+    # Keep lines unstripped: isspace() is an allocation-free C scan, and
+    # SECTION_HEADER tolerates surrounding whitespace (^\s* ... \s*$)
+    lines = [l for l in text.splitlines() if l and not l.isspace()]
+    if len(lines) > 1:
+        return lines
+    # fallback: the parser space-joins lines, so a page can arrive as one
+    # long line - split it on sentence boundaries instead
+    return _SENT_SPLIT.split(text)
 
 # -------------------------
 # LOAD DOCUMENT
 # -------------------------
-blob_service = BlobServiceClient.from_connection_string(STORAGE_CONN_STRING)
-parsed_container = blob_service.get_container_client(PARSED_CONTAINER)
-
-blob = parsed_container.get_blob_client(BLOB_NAME)
-parsed = json.loads(blob.download_blob().readall())
+@functools.lru_cache(maxsize=1)
+def _get_container():
+    """One cached client: repeated calls reuse the same HTTPS pool
+    instead of re-resolving DNS and re-handshaking TLS."""
+    if STORAGE_ACCOUNT_URL:
+        # Managed identity on Azure compute: the credential caches its
+        # token (~1h), so repeated calls skip the auth handshake instead
+        # of HMAC-signing every request with the shared key
+        service = BlobServiceClient(
+            account_url=STORAGE_ACCOUNT_URL,
+            credential=DefaultAzureCredential(),
+            connection_timeout=20,
+            read_timeout=120,
+        )
+    else:
+        # Local dev fallback: connection string from .env
+        service = BlobServiceClient.from_connection_string(
+            STORAGE_CONN_STRING,
+            connection_timeout=20,
+            read_timeout=120,
+        )
+    return service.get_container_client(PARSED_CONTAINER)
+
+blob = _get_container().get_blob_client(BLOB_NAME)
+# readinto a BytesIO and parse the buffer view directly - no intermediate
+# bytes copy from readall(), and the ranges download in parallel
+downloader = blob.download_blob(max_concurrency=4)
+buf = io.BytesIO()
+downloader.readinto(buf)
+parsed = orjson.loads(buf.getbuffer())
 
 # -------------------------
 # BUILD LINEAR TEXT + PAGE OFFSETS
 # -------------------------
-full_text = ""
-page_offsets = []
+# Accumulate parts and join once - repeated += concatenation is
+# quadratic when CPython's in-place optimization misses. An integer
+# counter tracks offsets so len(full_text) is never consulted.
+# Page offsets live directly in parallel arrays - no per-page dicts, and
+# the monotonic starts feed the bisect lookups below
+parts = []
+page_starts = array.array('l')
+page_nums = []
+offset = 0
 
 for page in parsed["pages"]:
-    start = len(full_text)
-    full_text += page["text"] + "\n"
-    end = len(full_text)
+    t = page["text"]
+    parts.append(t)
+    parts.append("\n")
 
-    page_offsets.append({
-        "page": page["page_number"],
-        "start": start,
-        "end": end
-    })
+    page_starts.append(offset)
+    page_nums.append(page["page_number"])
+    offset += len(t) + 1
+
+full_text = "".join(parts)
 
 # -------------------------
-# FIND SECTION HEADERS WITH OFFSETS
+# FIND SECTION HEADERS + RANGES (SINGLE PASS)
 # -------------------------
+def finalize_section(sec, end):
+    """Close off a section once the next header (or EOF) fixes its end."""
+    sec.end_offset = end
+    # page range: O(log P) bisect instead of scanning page offsets. The
+    # section's last character sits at end - 1: when the next header opens
+    # a page, end equals that page's start and bisecting on end itself
+    # would overshoot by one page
+    sec.end_page = page_nums[bisect.bisect_right(page_starts, end - 1) - 1]
+    sec.text = full_text[sec.start_offset:end].strip()
+    # subsection count: one finditer pass, no re-split of the body
+    sec.subsections = sum(1 for _ in _SUB_COUNT.finditer(sec.text))
+
 sections = []
+prev_section = None
 
-cursor = 0
-for page in parsed["pages"]:
+for page, page_start in zip(parsed["pages"], page_starts):
     page_num = page["page_number"]
-    lines = split_lines(page["text"])
+    page_text = page["text"]
+    lines = split_lines(page_text)
 
+    # Locate lines within the page (kilobytes) instead of scanning the
+    # whole concatenated document per header
+    local_cursor = 0
     for line in lines:
         m = SECTION_HEADER.match(line)
         if not m:
             continue
 
         number, title = m.group(1), m.group(2)
-        first_word = title.split()[0]
-
-        # reject months and TOC artifacts
-        if first_word in MONTHS:
-            continue
-        if re.search(r'\s\d{1,4}$', line):  # TOC row
-            continue
 
-        offset = full_text.find(line, cursor)
-        if offset == -1:
+        local = page_text.find(line, local_cursor)
+        if local == -1:
             continue
 
-        sections.append({
-            "number": number,
-            "title": title,
-            "start_offset": offset,
-            "start_page": page_num
-        })
-
-        cursor = offset + len(line)
-
-# -------------------------
-# COMPUTE SECTION RANGES
-# -------------------------
-for i, sec in enumerate(sections):
-    start = sec["start_offset"]
-    end = sections[i+1]["start_offset"] if i+1 < len(sections) else len(full_text)
-
-    sec["end_offset"] = end
-
-    # page range
-    start_page = sec["start_page"]
-    end_page = start_page
-    for p in page_offsets:
-        if p["start"] <= end <= p["end"]:
-            end_page = p["page"]
-            break
+        # The new header's offset is the previous section's end, so the
+        # previous section can be finalized here instead of in a second
+        # pass over the whole list
+        start_offset = page_start + local
+        if prev_section is not None:
+            finalize_section(prev_section, start_offset)
 
-    sec["end_page"] = end_page
+        prev_section = Section(number, title, start_offset, page_num)
+        sections.append(prev_section)
 
-    # full text
-    text = full_text[start:end].strip()
-    sec["text"] = text
+        local_cursor = local + len(line)
 
-    # subsection count
-    sec["subsections"] = len([
-        line for line in split_lines(text)
-        if SUBSECTION.match(line)
-    ])
+# The last section runs to the end of the document
+if prev_section is not None:
+    finalize_section(prev_section, len(full_text))
 
 # -------------------------
 # PRINT FULL DEBUG (FIRST 5 SECTIONS)
@@ -140,11 +189,11 @@ print(f"\n📘 Total sections detected: {len(sections)}\n")
 
 for i, sec in enumerate(sections[:5], 1):
     print("=" * 100)
-    print(f"SECTION {sec['number']} — {sec['title']}")
-    print(f"Pages: {sec['start_page']} → {sec['end_page']}")
-    print(f"Subsections: {sec['subsections']}")
+    print(f"SECTION {sec.number} — {sec.title}")
+    print(f"Pages: {sec.start_page} → {sec.end_page}")
+    print(f"Subsections: {sec.subsections}")
     print("-" * 100)
-    print(sec["text"])   # FULL TEXT — NO TRUNCATION
+    print(sec.text)   # FULL TEXT — NO TRUNCATION
     print()
 
 print("\n✅ Full-section debug complete")